@@ -1,3 +1,11 @@
-from .factories import FileOpener, PathFinder, StringOpener, ByteOpener
+from .factories import Factory, FileOpener, PathFinder, StringOpener, ByteOpener
+from .pool import FileHandlePool
 
-__all__ = ("FileOpener", "PathFinder", "StringOpener", "ByteOpener")
+__all__ = (
+    "Factory",
+    "FileOpener",
+    "PathFinder",
+    "StringOpener",
+    "ByteOpener",
+    "FileHandlePool",
+)
@@ -0,0 +1,155 @@
+from types import ModuleType
+from pathlib import Path
+from contextlib import ExitStack
+from threading import Lock
+import importlib.resources as pkg
+import atexit
+import os
+
+from . import _files
+
+type Source = str | ModuleType
+
+
+class FactoryContext:
+    """
+    The state shared by every factory for the same source: its resolved root and the
+    descriptors of the directories opened beneath it. Use `FactoryContext.get` rather
+    than creating one directly, so factories for the same package share a context.
+
+    Zip backed packages are extracted by `as_file`, so their extraction is kept alive
+    until exit rather than redone for each factory.
+    """
+
+    _contexts: dict[Source, "FactoryContext"] = {}
+    _contexts_lock = Lock()
+    _stack = ExitStack()
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root_str = os.fspath(root)
+        self.dfd_cache: dict[str, int] = {}
+        # Replaced descriptors may still be in use by other threads, so they are only
+        # closed along with the rest.
+        self._retired: list[int] = []
+        self._lock = Lock()
+
+    @classmethod
+    def get(cls, source: Source) -> "FactoryContext":
+        """
+        The context for a source, resolving its root on first use.
+        """
+        ctx = cls._contexts.get(source)
+        if ctx is not None:
+            return ctx
+        with cls._contexts_lock:
+            ctx = cls._contexts.get(source)
+            if ctx is None:
+                root = cls._stack.enter_context(pkg.as_file(pkg.files(source)))
+                ctx = cls._contexts[source] = cls(root)
+        return ctx
+
+    def dir_fd(self, directory: str) -> int:
+        """
+        A descriptor for a directory, opened on first use and then kept open. The
+        descriptor keeps pointing at the original directory if it is later moved or
+        replaced, call `refresh` to look the directory up again.
+        """
+        fd = self.dfd_cache.get(directory)
+        if fd is not None:
+            return fd
+        fd = _files.open_dir(directory)
+        with self._lock:
+            cached = self.dfd_cache.setdefault(directory, fd)
+        if cached != fd:
+            os.close(fd)
+        return cached
+
+    def refresh(self, directory: str, fd: int) -> int | None:
+        """
+        Check whether the descriptor `fd` for a directory is stale, meaning the
+        directory at its path has been replaced, and if so swap in a descriptor for
+        the new directory. The stale descriptor is kept open until `close`, as other
+        threads may still be using it.
+
+        Returns:
+            The descriptor to retry with, or None if `fd` was not stale.
+        """
+        try:
+            st = os.stat(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        current = os.fstat(fd)
+        # A removed directory's inode can be reused by the one replacing it.
+        if current.st_nlink and os.path.samestat(current, st):
+            return None
+        fresh = _files.open_dir(directory)
+        with self._lock:
+            cached = self.dfd_cache.get(directory)
+            if cached == fd:
+                self.dfd_cache[directory] = fresh
+                self._retired.append(fd)
+                return fresh
+        # Another thread has already swapped it.
+        os.close(fresh)
+        return self.dir_fd(directory)
+
+    def open_at(self, path: str, flags: int) -> int:
+        """
+        `os.open` a file relative to the cached descriptor of its directory, so the
+        kernel only resolves its final component. Fits the `opener` of `open`.
+        """
+        directory, name = os.path.split(path)
+        try:
+            fd = self.dir_fd(directory)
+            try:
+                return os.open(name, flags, 0o666, dir_fd=fd)
+            except (FileNotFoundError, NotADirectoryError):
+                # The directory may have been replaced since its descriptor was
+                # cached, in which case retry against the new one.
+                fd = self.refresh(directory, fd)
+                if fd is None:
+                    raise
+                return os.open(name, flags, 0o666, dir_fd=fd)
+        except OSError as e:
+            raise type(e)(e.errno, e.strerror, path) from None
+
+    def stat_at(self, path: str) -> os.stat_result:
+        """
+        `os.stat` a file relative to the cached descriptor of its directory.
+        """
+        directory, name = os.path.split(path)
+        try:
+            fd = self.dir_fd(directory)
+            try:
+                return os.stat(name, dir_fd=fd)
+            except (FileNotFoundError, NotADirectoryError):
+                fd = self.refresh(directory, fd)
+                if fd is None:
+                    raise
+                return os.stat(name, dir_fd=fd)
+        except OSError as e:
+            raise type(e)(e.errno, e.strerror, path) from None
+
+    def close(self) -> None:
+        """
+        Close every directory descriptor the context holds, they reopen when needed.
+        """
+        with self._lock:
+            fds = [*self.dfd_cache.values(), *self._retired]
+            self.dfd_cache.clear()
+            self._retired.clear()
+        for fd in fds:
+            os.close(fd)
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._contexts_lock:
+            contexts = list(cls._contexts.values())
+            cls._contexts.clear()
+        for ctx in contexts:
+            ctx.close()
+        cls._stack.close()
+
+
+atexit.register(FactoryContext.close_all)
@@ -0,0 +1,222 @@
+from typing import IO, Callable
+from functools import lru_cache
+import locale
+import mmap
+import os
+import shutil
+
+type Opener = Callable[[str, int], int]
+
+# Without O_BINARY Windows would translate line endings when reading a raw descriptor.
+O_BINARY = getattr(os, "O_BINARY", 0)
+
+# Files up to this size are read with a single unbuffered `os.read`, where the buffered
+# IO stack is pure overhead. Between the two limits a buffered reader is used, and files
+# larger than `MMAP_LIMIT` are memory mapped.
+DIRECT_READ_LIMIT = 1 << 16
+MMAP_LIMIT = 1 << 20
+
+# Windows can't open relative to a directory descriptor, so it uses the full path.
+SUPPORTS_DIR_FD = os.open in os.supports_dir_fd
+# O_PATH gives a handle that can only anchor lookups, so no read permission on the
+# directory is needed.
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_PATH", 0) | getattr(os, "O_DIRECTORY", 0)
+
+
+def open_dir(path: str) -> int:
+    """
+    Open a descriptor for a directory, for files to be opened relative to so the kernel
+    only has to resolve their final component.
+    """
+    return os.open(path, _DIR_FLAGS)
+
+
+@lru_cache
+def mode_flags(mode: str) -> int:
+    """
+    The `os.open` flags for an `open` mode, worked out once per mode.
+    Doesn't validate the mode, `open` rejects bad modes before using the flags.
+    """
+    if "+" in mode:
+        flags = os.O_RDWR
+    elif "r" in mode:
+        flags = os.O_RDONLY
+    else:
+        flags = os.O_WRONLY
+
+    if "w" in mode:
+        flags |= os.O_CREAT | os.O_TRUNC
+    elif "a" in mode:
+        flags |= os.O_CREAT | os.O_APPEND
+    elif "x" in mode:
+        flags |= os.O_CREAT | os.O_EXCL
+
+    # Text modes are decoded by `open`'s wrappers, so the descriptor is binary like
+    # `open` makes it.
+    return flags | O_BINARY | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_NOCTTY", 0)
+
+
+def opener_for(name: str, flags: int, dir_fd: int | None = None) -> Opener:
+    """
+    An `opener` for `open` that opens `name` with fixed flags, relative to a directory
+    descriptor if one is given. The path and flags `open` passes in are ignored.
+    """
+
+    def opener(_: str, __: int) -> int:
+        return os.open(name, flags, 0o666, dir_fd=dir_fd)
+
+    return opener
+
+
+def read_bytes(path: str | os.PathLike[str]) -> bytes:
+    """
+    Read a whole file, picking the cheapest way to read it for its size.
+    """
+    fd = os.open(path, os.O_RDONLY | O_BINARY)
+    try:
+        size = os.fstat(fd).st_size
+        if size > MMAP_LIMIT:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:]
+        if size > DIRECT_READ_LIMIT:
+            return _read_buffered(fd)
+        return _read_small(fd, size)
+    finally:
+        os.close(fd)
+
+
+def read_text(
+    path: str | os.PathLike[str], encoding: str | None, errors: str | None
+) -> str:
+    """
+    Read a whole file as text the same way `Path.read_text` would, including the locale
+    default encoding and universal newlines. Large files are decoded straight from a
+    memory map so the raw bytes are never copied into Python.
+    """
+    if encoding is None or encoding == "locale":
+        encoding = locale.getpreferredencoding(False)
+    if errors is None:
+        errors = "strict"
+
+    fd = os.open(path, os.O_RDONLY | O_BINARY)
+    try:
+        size = os.fstat(fd).st_size
+        if size > MMAP_LIMIT:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, encoding, errors)
+        elif size > DIRECT_READ_LIMIT:
+            text = str(_read_buffered(fd), encoding, errors)
+        else:
+            text = str(_read_small(fd, size), encoding, errors)
+    finally:
+        os.close(fd)
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def prefetch(path: str | os.PathLike[str]) -> None:
+    """
+    Ask the OS to start pulling a file into the page cache without waiting for it.
+    Platforms without `posix_fadvise` (Windows, macOS) have no such hint, so there the
+    file is read through once instead.
+    """
+    fd = os.open(path, os.O_RDONLY | O_BINARY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, shutil.COPY_BUFSIZE):
+                pass
+    finally:
+        os.close(fd)
+
+
+def _read_small(fd: int, size: int) -> bytes:
+    # Asking for one byte more than fstat reported finds EOF without a second read.
+    data = os.read(fd, size + 1)
+    if len(data) == size:
+        return data
+    # Either the file grew since the fstat or the read came back short, which is not
+    # necessarily EOF, so read whatever is left the slow way.
+    return data + _read_buffered(fd)
+
+
+def _read_buffered(fd: int) -> bytes:
+    with open(fd, "rb", closefd=False) as f:
+        return f.read()
+
+
+def copy_to(path: str | os.PathLike[str], dst: IO[bytes] | int) -> int:
+    """
+    Copy a whole file into `dst`, a binary file or a raw descriptor, at its current
+    position. Uses `os.sendfile` or `os.copy_file_range` when the platform can copy
+    between the two descriptors in the kernel, and falls back to copying through
+    userspace otherwise.
+
+    Returns:
+        The number of bytes copied.
+    """
+    if isinstance(dst, int):
+        dst_fd = dst
+    else:
+        # Anything still buffered has to land before the kernel starts writing behind
+        # its back.
+        dst.flush()
+        try:
+            dst_fd = dst.fileno()
+        except (AttributeError, OSError):
+            dst_fd = None
+
+    fd = os.open(path, os.O_RDONLY | O_BINARY)
+    try:
+        if dst_fd is not None:
+            copied = _copy_in_kernel(fd, dst_fd, os.fstat(fd).st_size)
+            if copied is not None:
+                return copied
+        if isinstance(dst, int):
+            with open(dst, "wb", closefd=False) as out:
+                return _copy_chunks(fd, out)
+        return _copy_chunks(fd, dst)
+    finally:
+        os.close(fd)
+
+
+def _copy_in_kernel(src: int, dst: int, size: int) -> int | None:
+    # Either call can refuse a pair of descriptors outright (sockets only on macOS,
+    # different filesystems on older kernels). That is only safe to fall back from
+    # before anything is copied.
+    copied = 0
+    if hasattr(os, "sendfile"):
+        try:
+            while copied < size:
+                sent = os.sendfile(dst, src, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return copied
+        except OSError:
+            if copied:
+                raise
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < size:
+                sent = os.copy_file_range(src, dst, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return copied
+        except OSError:
+            if copied:
+                raise
+    return None
+
+
+def _copy_chunks(src: int, dst: IO[bytes]) -> int:
+    copied = 0
+    while chunk := os.read(src, shutil.COPY_BUFSIZE):
+        dst.write(chunk)
+        copied += len(chunk)
+    dst.flush()
+    return copied
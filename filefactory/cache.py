@@ -0,0 +1,347 @@
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator
+from collections import OrderedDict
+from queue import Empty, SimpleQueue
+from threading import Lock
+from time import monotonic
+import os
+
+from .pool import descriptor_limit
+
+if TYPE_CHECKING:
+    from .pool import FileHandlePool
+
+type HandleKey = tuple[str, str, int, str | None, str | None, str | None]
+type Entry = tuple[IO, "FileHandlePool | None"]
+type Signature = tuple[int, int, int, int]
+type Dropped = tuple[HandleKey, IO, "FileHandlePool | None", Signature | None]
+
+
+def _open_descriptors() -> int | None:
+    # Windows has no cheap way to count handles without psutil, so it never sweeps.
+    for listing in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(listing))
+        except OSError:
+            continue
+    return None
+
+
+def is_read_mode(mode: str) -> bool:
+    return not any(c in mode for c in "wax+")
+
+
+def _signature(st: os.stat_result) -> Signature:
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _opened_as(io: IO) -> Signature | None:
+    # The file behind the descriptor as it is now, ideally taken right after opening.
+    try:
+        return _signature(os.fstat(io.fileno()))
+    except (OSError, ValueError):
+        return None
+
+
+def _unchanged(
+    signature: Signature | None,
+    path: str,
+    stat: Callable[[str], os.stat_result] = os.stat,
+) -> bool:
+    # Whether the path still names the file a handle was opened on, as it was then. A
+    # file rewritten in place keeps its inode, so the descriptor alone can't tell.
+    try:
+        return signature is not None and signature == _signature(stat(path))
+    except OSError:
+        return False
+
+
+def _close(io: IO, pool: "FileHandlePool | None") -> None:
+    try:
+        io.close()
+    finally:
+        if pool is not None:
+            pool.release()
+
+
+class CachedHandle:
+    """
+    A file handle borrowed from a `HandleCache`. Behaves like the file object it wraps,
+    but leaving a `with` block flushes it and hands it back to the cache instead of
+    closing it. Calling `close` closes the underlying file for real. A handle that is
+    dropped without either is handed back to the cache when it is garbage collected,
+    and picked up by the cache's next `open` or `clear`.
+    """
+
+    def __init__(
+        self,
+        cache: "HandleCache",
+        key: HandleKey,
+        io: IO,
+        pool: "FileHandlePool | None",
+        signature: Signature | None = None,
+    ) -> None:
+        self._cache = cache
+        self._key = key
+        self._io = io
+        self._pool = pool
+        self._signature = signature
+        self._released = False
+
+    @property
+    def closed(self) -> bool:
+        return self._released or self._io.closed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._borrowed(), name)
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self) -> Any:
+        return next(self._borrowed())
+
+    def _borrowed(self) -> IO:
+        if self._released:
+            raise ValueError("I/O operation on a handle returned to its cache")
+        return self._io
+
+    def __enter__(self) -> "CachedHandle":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    def release(self) -> None:
+        """
+        Return the handle to its cache. Does nothing if it was already returned.
+        """
+        if self._released:
+            return
+        self._released = True
+        try:
+            if not self._io.closed:
+                self._io.flush()
+        finally:
+            self._cache.release(self._key, self._io, self._pool, self._signature)
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        _close(self._io, self._pool)
+
+    def __del__(self) -> None:
+        # A collection can start while this thread holds the cache's lock, so the handle
+        # is only queued here and never touches the lock.
+        if not getattr(self, "_released", True):
+            self._released = True
+            self._cache.dropped(self._key, self._io, self._pool, self._signature)
+
+
+class HandleCache:
+    """
+    An LRU cache of idle read-only file handles. Reopening a file that is already cached
+    reuses its descriptor and seeks back to the start instead of opening the file again.
+
+    Only handles that have been returned to the cache are idle. A handle that is in use
+    is never shared, so a second request for the same file while the first is still open
+    opens a new descriptor. Write and update modes are never cached.
+
+    When opening through a `FileHandlePool` a handle holds its slot for as long as its
+    descriptor is open, idle or not. Register `clear` as a reclaimer on the pool so idle
+    handles are closed when it runs dry.
+
+    Cached descriptors keep pointing at the file they were opened on, so before an idle
+    handle is reused the path on disk is compared with the file as it was when the
+    handle was opened. A handle whose file was replaced or modified since is closed and
+    the file opened again.
+
+    Idle handles are also dropped when the whole process is running low on descriptors,
+    see `sweep`. Handles that are in use are never closed by the cache.
+
+    Args:
+        maxsize: The most idle handles to keep open. Defaults to half the process
+                 descriptor limit capped at 256.
+        timeout: How many seconds a handle may stay idle before it is closed.
+        watermark: The fraction of the descriptor limit in use above which `sweep`
+                   closes every idle handle.
+        sweep_interval: The least number of seconds between sweeps run by `open`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        timeout: float = 30.0,
+        watermark: float = 0.8,
+        sweep_interval: float = 1.0,
+    ) -> None:
+        self._limit = descriptor_limit()
+        self.maxsize = (
+            max(1, min(256, self._limit // 2)) if maxsize is None else maxsize
+        )
+        self.timeout = timeout
+        self.watermark = watermark
+        self.sweep_interval = sweep_interval
+        self._last_sweep = monotonic()
+        self._idle: OrderedDict[
+            HandleKey, tuple[IO, "FileHandlePool | None", Signature | None, float]
+        ] = OrderedDict()
+        self._dropped: SimpleQueue[Dropped] = SimpleQueue()
+        self._lock = Lock()
+
+    def open(
+        self,
+        path: str | os.PathLike[str],
+        mode: str = "r",
+        buffering: int = -1,
+        encoding: str | None = None,
+        errors: str | None = None,
+        newline: str | None = None,
+        pool: "FileHandlePool | None" = None,
+        opener: Callable[[str, int], int] | None = None,
+        stat: Callable[[str], os.stat_result] | None = None,
+    ) -> CachedHandle:
+        """
+        Open a file for reading, reusing an idle cached handle if there is one.
+
+        See `open` for the other arguments.
+
+        Args:
+            pool: The pool to take a slot from when a new descriptor has to be opened.
+            stat: Used in place of `os.stat` to check whether an idle handle's file
+                  has changed.
+        """
+        if not is_read_mode(mode):
+            raise ValueError(f"Only read modes can be cached, not {mode!r}")
+
+        for dropped in self._take_dropped():
+            self.release(*dropped)
+
+        key = (os.fspath(path), mode, buffering, encoding, errors, newline)
+        now = monotonic()
+        with self._lock:
+            expired = self._expire(now)
+            entry = self._idle.pop(key, None)
+        self._close_all(expired)
+
+        if entry is not None:
+            io, entry_pool, signature, _ = entry
+            if _unchanged(signature, key[0], stat or os.stat):
+                io.seek(0)
+                return CachedHandle(self, key, io, entry_pool, signature)
+            _close(io, entry_pool)
+
+        # Only opening a new descriptor can push the process over the limit, so only
+        # misses sweep.
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep()
+
+        if pool is not None:
+            pool.acquire()
+        try:
+            io = open(path, mode, buffering, encoding, errors, newline, opener=opener)
+        except BaseException:
+            if pool is not None:
+                pool.release()
+            raise
+        return CachedHandle(self, key, io, pool, _opened_as(io))
+
+    def release(
+        self,
+        key: HandleKey,
+        io: IO,
+        pool: "FileHandlePool | None" = None,
+        signature: Signature | None = None,
+    ) -> None:
+        """
+        Make a handle idle again so the next `open` of the same file can reuse it.
+
+        Args:
+            signature: The file as it was when the handle was opened. Defaults to the
+                       file as it is now.
+        """
+        if io.closed:
+            _close(io, pool)
+            return
+        if signature is None:
+            signature = _opened_as(io)
+        evicted = []
+        with self._lock:
+            if key in self._idle:
+                evicted.append((io, pool))
+            else:
+                self._idle[key] = (io, pool, signature, monotonic())
+            while len(self._idle) > self.maxsize:
+                evicted.append(self._idle.popitem(last=False)[1][:2])
+        self._close_all(evicted)
+
+    def dropped(
+        self,
+        key: HandleKey,
+        io: IO,
+        pool: "FileHandlePool | None",
+        signature: Signature | None = None,
+    ) -> None:
+        """
+        Queue a handle that was garbage collected without being released. Safe to call
+        from a finalizer, the handle is dealt with by the next `open` or `clear`.
+        """
+        self._dropped.put((key, io, pool, signature))
+
+    def clear(self) -> None:
+        """
+        Close every idle handle.
+        """
+        self._evict_all()
+
+    def sweep(self) -> int:
+        """
+        Close every idle handle if the process has more than `watermark` of its
+        descriptor limit open. Does nothing where open descriptors can't be counted.
+
+        Returns:
+            How many handles were closed.
+        """
+        used = _open_descriptors()
+        if used is None or used <= self.watermark * self._limit:
+            return 0
+        return self._evict_all()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def _evict_all(self) -> int:
+        evicted = [(io, pool) for _, io, pool, _ in self._take_dropped()]
+        with self._lock:
+            evicted.extend((io, pool) for io, pool, _, _ in self._idle.values())
+            self._idle.clear()
+        self._close_all(evicted)
+        return len(evicted)
+
+    def _take_dropped(self) -> list[Dropped]:
+        dropped = []
+        while True:
+            try:
+                dropped.append(self._dropped.get_nowait())
+            except Empty:
+                return dropped
+
+    def _expire(self, now: float) -> list[Entry]:
+        # Entries are kept in release order, so the stale ones are all at the front.
+        expired = []
+        while self._idle:
+            key, (io, pool, _, released) = next(iter(self._idle.items()))
+            if now - released < self.timeout:
+                break
+            del self._idle[key]
+            expired.append((io, pool))
+        return expired
+
+    @staticmethod
+    def _close_all(handles: list[Entry]) -> None:
+        for io, pool in handles:
+            _close(io, pool)
+
+
+handle_cache = HandleCache()
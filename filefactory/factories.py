@@ -1,24 +1,100 @@
-from typing import Any, IO, Generator, Callable, Protocol
+from typing import Any, IO, Generator, Callable, Iterable, Protocol, Sequence
 from types import ModuleType
 from pathlib import Path
+from collections import OrderedDict
 from contextlib import contextmanager
-import importlib.resources as pkg
+from functools import lru_cache
+from threading import Lock
+import os
+import sys
 
-type Source = str | ModuleType
+from . import _files
+from ._context import FactoryContext, Source
+from .cache import handle_cache, is_read_mode
+from .pool import FileHandlePool, default_pool
+from .threaded import map_ordered
+
+# How many decoded files each `StringOpener` keeps around.
+_TEXT_CACHE_SIZE = 128
+
+
+def _path_builder(root: str, extension: str) -> Callable[[tuple[str, ...], str], str]:
+    # For callers that hand the path straight to the OS, skips building a Path entirely.
+    # The root and extension are fixed once a factory exists, so they are baked into the
+    # closure, and relative names directly in the root skip `os.path.join` altogether.
+    # Elsewhere joining is left to `os.path.join`, so absolute names and drives behave
+    # the same with or without sub directories.
+    prefix = os.path.join(root, "")
+    join = os.path.join
+    concat = os.sep == "/" and os.altsep is None
+
+    def build(sub: tuple[str, ...], name: str) -> str:
+        if concat and not sub and not name.startswith("/"):
+            return prefix + name + extension
+        return join(root, *sub, name + extension)
+
+    return build
+
+
+class Factory[T](Protocol):
+    """
+    What every factory is called with: the name of a file, optionally followed by the
+    sub directories it is in. Useful for accepting any factory that produces a `T`.
+    """
+
+    def __call__(self, name: str, sub: tuple[str, ...] = (), /) -> T: ...
 
 
 class FileFactoryBase:
 
+    __slots__ = (
+        "source",
+        "extension",
+        "root",
+        "_root_str",
+        "_resolve",
+        "_build_str",
+        "_ctx",
+    )
+
     def __init__(self, source: Source, extension: str | None) -> None:
         self.source = source
         if extension is not None and not extension.startswith("."):
             extension = "." + extension
-        self.extension = extension or ""
-        with pkg.as_file(pkg.files(source)) as root_pth:
-            self.root = root_pth
+        self.extension = sys.intern(extension or "")
+        self._ctx = FactoryContext.get(source)
+        self.root = self._ctx.root
+        self._root_str = self._ctx.root_str
+        self._resolve = lru_cache(maxsize=4096)(self._join)
+        self._build_str = _path_builder(self._root_str, self.extension)
 
-    def __call__(self, name: str, sub: tuple[str, ...] = (), **kwargs) -> Path:
-        pass
+    def _join(self, sub: tuple[str, ...], name: str) -> Path:
+        return self.root.joinpath(*sub, name + self.extension)
+
+    def prefetch(self, names: Iterable[str], sub: tuple[str, ...] = ()) -> None:
+        """
+        Warm the OS page cache for files that are about to be read, so later calls don't
+        wait on the disk. Useful at start up for a known set of assets.
+
+        Args:
+            names: The names of the files. If no file extension was provided on
+                creation it must be included in each name.
+            sub: Any sub directories from the root as a tuple ('<subdir1>', '<subdir2>')
+        """
+        for name in names:
+            _files.prefetch(self._build_str(sub, name))
+
+    def _opener(self, path: str, flags: int) -> _files.Opener:
+        # Opens relative to a cached descriptor of the file's directory where the
+        # platform allows it.
+        if not _files.SUPPORTS_DIR_FD:
+            return _files.opener_for(path, flags)
+        open_at = self._ctx.open_at
+
+        def opener(_: str, __: int) -> int:
+            return open_at(path, flags)
+
+        return opener
 
 
 class FileOpener(FileFactoryBase):
@@ -32,8 +108,22 @@ class FileOpener(FileFactoryBase):
         source: The location to open at, as a module from `import <x>`.
         extension: The file extension expected to open. can be `.<extension>` or  `<extension>` or `None`.
                    If None is provided then the extension must included in the file name when calling the returned function
+        pool: The `FileHandlePool` that limits how many files can be open at once.
+              Defaults to a pool shared by the whole process.
     """
 
+    __slots__ = (
+        "pool",
+        "default_mode",
+        "default_buffering",
+        "default_encoding",
+        "default_errors",
+        "default_newline",
+        "_flags",
+        "_read_opener",
+        "_stat",
+    )
+
     def __init__(
         self,
         source: Source,
@@ -44,14 +134,28 @@ class FileOpener(FileFactoryBase):
         encoding: str | None = None,
         errors: str | None = None,
         newline: str | None = None,
+        pool: FileHandlePool | None = None,
     ) -> None:
-        FileFactoryBase.__init__(self, source, extension)
+        super().__init__(source, extension)
+        # The default mode's flags are worked out now rather than on every open.
+        self._flags = _files.mode_flags(mode)
+        # Cached reads go through fixed callables, as a per call opener would mostly be
+        # thrown away on a cache hit. `open` works out read flags the same way
+        # `mode_flags` does, short of O_NOCTTY, which only matters for terminals.
+        if _files.SUPPORTS_DIR_FD:
+            self._read_opener: _files.Opener | None = self._ctx.open_at
+            self._stat: Callable[[str], os.stat_result] | None = self._ctx.stat_at
+        else:
+            self._read_opener = self._stat = None
+        self.pool = pool if pool is not None else default_pool()
+        self.pool.add_reclaimer(handle_cache.clear)
         self.default_mode = mode
         self.default_buffering = buffering
         self.default_encoding = encoding
         self.default_errors = errors
         self.default_newline = newline
 
+    @contextmanager
     def __call__(
         self,
         name: str,
@@ -64,10 +168,19 @@ class FileOpener(FileFactoryBase):
         newline: str | None = None,
     ) -> Generator[IO, None, None]:
         """
-        Open a file with a predetermined location.
+        Open a file with a predetermined location, for use in a `with` block.
         Also has the arguments for `pathlib.Path.open` available. Custom defaults can be provided
         at the same time as the extension and source
 
+        Files opened for reading are shared through an LRU cache of idle handles, so
+        leaving the `with` block returns the handle to the cache rather than closing it.
+        Reopening the same file later seeks the cached handle back to the start instead
+        of opening it again, unless the file was replaced or modified on disk since, in
+        which case the stale handle is closed and the file opened fresh.
+
+        Every open file holds a slot in the opener's pool until it is closed, so once
+        the pool is exhausted further calls wait for a file to close.
+
         See `Path.open` for other arguments
 
         Args:
@@ -75,6 +188,68 @@ class FileOpener(FileFactoryBase):
                 creation it must be included in the name.
             directories: Any sub directories from the root as a tuple ('<subdir1>', '<subdir2>')
         """
+        flags = self._flags if mode is None else None
+        mode, buffering, encoding, errors, newline = self._with_defaults(
+            mode, buffering, encoding, errors, newline
+        )
+        path = self._build_str(directories, name)
+        if not is_read_mode(mode):
+            if flags is None:
+                flags = _files.mode_flags(mode)
+            opener = self._opener(path, flags)
+            with self.pool.open(
+                path, mode, buffering, encoding, errors, newline, opener
+            ) as io:
+                yield io
+            return
+
+        handle = handle_cache.open(
+            path,
+            mode,
+            buffering,
+            encoding,
+            errors,
+            newline,
+            self.pool,
+            self._read_opener,
+            self._stat,
+        )
+        try:
+            yield handle
+        finally:
+            handle.release()
+
+    def open_raw(
+        self,
+        name: str,
+        directories: tuple[str, ...] = (),
+        *,
+        mode: str | None = None,
+        buffering: int | None = None,
+        encoding: str | None = None,
+        errors: str | None = None,
+        newline: str | None = None,
+    ) -> IO:
+        """
+        Open a file with a predetermined location, bypassing the handle cache and pool.
+        The caller owns the returned file and is responsible for closing it.
+
+        Takes the same arguments as calling the opener.
+        """
+        mode, buffering, encoding, errors, newline = self._with_defaults(
+            mode, buffering, encoding, errors, newline
+        )
+        path = self._build_str(directories, name)
+        return open(path, mode, buffering, encoding, errors, newline)
+
+    def _with_defaults(
+        self,
+        mode: str | None,
+        buffering: int | None,
+        encoding: str | None,
+        errors: str | None,
+        newline: str | None,
+    ) -> tuple[str, int, str | None, str | None, str | None]:
         if mode is None:
             mode = self.default_mode
         if buffering is None:
@@ -85,10 +260,7 @@ class FileOpener(FileFactoryBase):
             errors = self.default_errors
         if newline is None:
             newline = self.default_newline
-
-        file = f"{name}{self.extension}"
-        path = self.root.joinpath(*directories).joinpath(file)
-        return path.open(mode, buffering, encoding, errors, newline)
+        return mode, buffering, encoding, errors, newline
 
 
 class PathFinder(FileFactoryBase):
@@ -101,8 +273,10 @@ class PathFinder(FileFactoryBase):
                    If None is provided then the extension must included in the file name when calling the returned function
     """
 
+    __slots__ = ()
+
     def __init__(self, source: Source, extension: str | None) -> None:
-        FileFactoryBase.__init__(source, extension)
+        super().__init__(source, extension)
 
     def __call__(self, name: str, sub: tuple[str, ...] = ()) -> Any:
         """
@@ -118,11 +292,13 @@ class PathFinder(FileFactoryBase):
         Returns:
             A pathlib Path object with the absolute path to the specified file
         """
-        return self.root.joinpath(*sub).joinpath(f"{name}{self.extension}")
+        return self._resolve(tuple(sub), name)
 
 
 class FileProcessor[T](FileFactoryBase):
 
+    __slots__ = ("input", "process", "args", "kwds")
+
     def __init__(
         self,
         source: str | ModuleType,
@@ -132,19 +308,21 @@ class FileProcessor[T](FileFactoryBase):
         *args,
         **kwds,
     ) -> None:
-        FileFactoryBase.__init__(source, extension)
+        super().__init__(source, extension)
         self.input = input
         self.process = process
         self.args = args
         self.kwds = kwds
 
     def __call__(self, name: str, sub: tuple[str, ...] = (), *args, **kwds) -> T:
-        file = self.root.joinpath(*sub).joinpath(f"{name}{self.extension}")
-        kwds = self.kwds.update(kwds)
+        file = self._resolve(tuple(sub), name)
         if self.input is None:
-            return self.process(file, *args, **kwds)
-        kwds[self.input] = file
-        return self.procss(*args, **kwds)
+            if kwds:
+                return self.process(file, *self.args, *args, **{**self.kwds, **kwds})
+            return self.process(file, *self.args, *args, **self.kwds)
+        return self.process(
+            *self.args, *args, **{**self.kwds, **kwds, self.input: file}
+        )
 
 
 class StringOpener(FileFactoryBase):
@@ -159,6 +337,8 @@ class StringOpener(FileFactoryBase):
 
     """
 
+    __slots__ = ("default_encoding", "default_errors", "_text_cache", "_text_lock")
+
     def __init__(
         self,
         source: str | ModuleType,
@@ -167,9 +347,13 @@ class StringOpener(FileFactoryBase):
         encoding: str | None = None,
         errors: str | None = None,
     ) -> None:
-        FileFactoryBase.__init__(source, extension)
+        super().__init__(source, extension)
         self.default_encoding = encoding
         self.default_errors = errors
+        self._text_cache: OrderedDict[
+            tuple[str, str | None, str | None], tuple[int, int, str]
+        ] = OrderedDict()
+        self._text_lock = Lock()
 
     def __call__(
         self,
@@ -183,6 +367,9 @@ class StringOpener(FileFactoryBase):
         Read the entire contents of the provided file and return it as a single sting.
         Uses the file extension provided at creation.
 
+        The decoded text of recently read files is cached, and reused for as long as the
+        file's modification time and size on disk stay the same.
+
         Args:
             name: The name of the file WITHOUT the file extension
             sub_directories: Any sub directories from the root WITHOUT seperators ('<subdir1>', '<subdir2>')
@@ -193,12 +380,65 @@ class StringOpener(FileFactoryBase):
             encoding = self.default_encoding
         if errors is None:
             errors = self.default_errors
-        return (
-            self.root.joinpath(*sub)
-            .joinpath(f"{name}{self.extension}")
-            .read_text(encoding, errors)
+
+        path = self._build_str(sub, name)
+        stat = os.stat(path)
+        key = (path, encoding, errors)
+        with self._text_lock:
+            hit = self._text_cache.get(key)
+            if (
+                hit is not None
+                and hit[0] == stat.st_mtime_ns
+                and hit[1] == stat.st_size
+            ):
+                self._text_cache.move_to_end(key)
+                return hit[2]
+
+        text = _files.read_text(path, encoding, errors)
+        # Large files would crowd everything else out of the cache, so they're re-read.
+        if stat.st_size <= _files.MMAP_LIMIT:
+            with self._text_lock:
+                self._text_cache[key] = (stat.st_mtime_ns, stat.st_size, text)
+                self._text_cache.move_to_end(key)
+                if len(self._text_cache) > _TEXT_CACHE_SIZE:
+                    self._text_cache.popitem(last=False)
+        return text
+
+    def read_many(
+        self,
+        names: Sequence[str],
+        sub: tuple[str, ...] = (),
+        *,
+        encoding: str | None = None,
+        errors: str | None = None,
+        workers: int = 8,
+    ) -> list[str]:
+        """
+        Read several files from the same directory at once, overlapping their IO.
+
+        Args:
+            names: The names of the files WITHOUT the file extension
+            sub_directories: Any sub directories from the root WITHOUT seperators ('<subdir1>', '<subdir2>')
+            encoding: The text encoding to use. Defaults to the provided encoding at creation.
+            errors: See pathlib.Path.read_text for details.
+            workers: The most files to read at the same time.
+
+        Returns:
+            The text of each file, in the same order as `names`
+        """
+        return map_ordered(
+            lambda name: self(name, sub, encoding=encoding, errors=errors),
+            names,
+            workers,
         )
 
+    def invalidate(self) -> None:
+        """
+        Forget every cached file so the next read of each goes back to disk.
+        """
+        with self._text_lock:
+            self._text_cache.clear()
+
 
 class ByteOpener(FileFactoryBase):
     """
@@ -209,6 +449,11 @@ class ByteOpener(FileFactoryBase):
         extension: The file extension expected to open. can be `.<extension>` or just `<extension>`
     """
 
+    __slots__ = ()
+
+    def __init__(self, source: Source, extension: str | None) -> None:
+        super().__init__(source, extension)
+
     def __call__(
         self,
         name: str,
@@ -225,4 +470,38 @@ class ByteOpener(FileFactoryBase):
         Returns:
             The entire file as bytes
         """
-        return self.root.joinpath(*sub).joinpath(f"{name}{self.extension}").read_bytes()
+        return _files.read_bytes(self._build_str(sub, name))
+
+    def read_many(
+        self, names: Sequence[str], sub: tuple[str, ...] = (), *, workers: int = 8
+    ) -> list[bytes]:
+        """
+        Read several files from the same directory at once, overlapping their IO.
+
+        Args:
+            names: The names of the files
+            sub_directories: Any sub directories from the root as a typle ('<subdir1>', '<subdir2>')
+            workers: The most files to read at the same time.
+
+        Returns:
+            The entire contents of each file, in the same order as `names`
+        """
+        paths = [self._build_str(sub, name) for name in names]
+        return map_ordered(_files.read_bytes, paths, workers)
+
+    def copy_to(
+        self, name: str, sub: tuple[str, ...] = (), *, dst: IO[bytes] | int
+    ) -> int:
+        """
+        Copy the contents of the provided file into another file without reading it into
+        memory. Where the platform supports it the copy happens entirely in the kernel.
+
+        Args:
+            name: The name of the file
+            sub_directories: Any sub directories from the root as a typle ('<subdir1>', '<subdir2>')
+            dst: The binary file or file descriptor to write to, from its current position.
+
+        Returns:
+            The number of bytes copied
+        """
+        return _files.copy_to(self._build_str(sub, name), dst)
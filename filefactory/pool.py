@@ -0,0 +1,132 @@
+from typing import IO, Any, Callable, Generator
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+import os
+import sys
+
+# Descriptors left for anything not opened through a pool (sockets, pipes, imports).
+_RESERVED = 64
+_UNLIMITED = 4096
+# How often a blocked `acquire` asks the reclaimers to free slots again.
+_RECLAIM_INTERVAL = 0.05
+
+
+def descriptor_limit() -> int:
+    """
+    How many files the process may have open at once.
+    """
+    if sys.platform == "win32":
+        import ctypes
+
+        return ctypes.cdll.msvcrt._getmaxstdio()
+
+    import resource
+
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return _UNLIMITED
+    return soft
+
+
+class FileHandlePool:
+    """
+    Bounds how many files can be open through the pool at once.
+    Opening a file takes a slot which is only given back once the file is closed,
+    so once every slot is taken further opens wait instead of failing with `EMFILE`.
+
+    Slots held by files nobody is using, such as idle cached handles, can be freed by
+    registering a reclaimer with `add_reclaimer`. A blocked `acquire` calls the
+    reclaimers while it waits.
+
+    Args:
+        capacity: The number of files that may be open at once. Defaults to the process
+                  descriptor limit less a small reserve for other descriptors.
+    """
+
+    def __init__(self, capacity: int | None = None) -> None:
+        if capacity is None:
+            capacity = max(1, descriptor_limit() - _RESERVED)
+        self.capacity = capacity
+        self._slots = BoundedSemaphore(capacity)
+        self._reclaimers: set[Callable[[], Any]] = set()
+
+    def add_reclaimer(self, reclaim: Callable[[], Any]) -> None:
+        """
+        Register a function that closes files which hold slots without being in use.
+        Registering the same function twice has no effect.
+        """
+        self._reclaimers.add(reclaim)
+
+    def acquire(self, blocking: bool = True, timeout: float | None = None) -> bool:
+        """
+        Take a slot, waiting for one to free up if `blocking` is set.
+        See `threading.Semaphore.acquire` for the arguments.
+
+        Returns:
+            Whether a slot was taken.
+        """
+        if self._slots.acquire(False):
+            return True
+        if not blocking:
+            return False
+
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            for reclaim in tuple(self._reclaimers):
+                reclaim()
+            wait = _RECLAIM_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - monotonic())
+                if wait <= 0:
+                    return self._slots.acquire(False)
+            if self._slots.acquire(True, wait):
+                return True
+
+    def release(self) -> None:
+        """
+        Give back a slot taken with `acquire`.
+        """
+        self._slots.release()
+
+    @contextmanager
+    def open(
+        self,
+        path: str | os.PathLike[str],
+        mode: str = "r",
+        buffering: int = -1,
+        encoding: str | None = None,
+        errors: str | None = None,
+        newline: str | None = None,
+        opener: Callable[[str, int], int] | None = None,
+    ) -> Generator[IO, None, None]:
+        """
+        Open a file while holding a slot. The file is closed and the slot given back
+        when the `with` block exits.
+
+        See `open` for the arguments.
+        """
+        self.acquire()
+        try:
+            with open(
+                path, mode, buffering, encoding, errors, newline, opener=opener
+            ) as io:
+                yield io
+        finally:
+            self.release()
+
+
+_default_pool: FileHandlePool | None = None
+_default_lock = Lock()
+
+
+def default_pool() -> FileHandlePool:
+    """
+    The process wide pool used by factories that aren't given one. Created on first use.
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_lock:
+            if _default_pool is None:
+                _default_pool = FileHandlePool()
+    return _default_pool
@@ -0,0 +1,17 @@
+from typing import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+
+def map_ordered[T, R](
+    fn: Callable[[T], R], items: Sequence[T], workers: int
+) -> list[R]:
+    """
+    Call `fn` on every item across a pool of threads, returning the results in the same
+    order as `items`. Blocking IO releases the GIL, so this lets independent reads
+    overlap. Runs in the calling thread when there is nothing to overlap.
+    """
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(fn, items))
@@ -0,0 +1,26 @@
+from types import ModuleType
+from pathlib import Path
+import importlib
+import uuid
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    """
+    A fresh, empty package to point factories at. Factories share state per source, so
+    every test gets a package under a name of its own.
+    """
+    name = f"ff_{uuid.uuid4().hex}"
+    (tmp_path / name).mkdir()
+    (tmp_path / name / "__init__.py").touch()
+    monkeypatch.syspath_prepend(tmp_path)
+    yield importlib.import_module(name)
+    sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def root(package: ModuleType) -> Path:
+    return Path(package.__file__).parent
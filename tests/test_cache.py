@@ -0,0 +1,246 @@
+import gc
+import os
+
+import pytest
+
+from filefactory import FileHandlePool
+from filefactory.cache import HandleCache
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"contents of {name}")
+        paths.append(path)
+    return paths
+
+
+def test_reuses_idle_handle(files):
+    cache = HandleCache()
+    handle = cache.open(files[0])
+    fd = handle.fileno()
+    assert handle.read(8) == "contents"
+    handle.release()
+
+    handle = cache.open(files[0])
+    assert handle.fileno() == fd
+    assert handle.read() == "contents of a"
+    handle.release()
+
+
+def test_handle_in_use_is_not_shared(files):
+    cache = HandleCache()
+    first = cache.open(files[0])
+    second = cache.open(files[0])
+    assert first.fileno() != second.fileno()
+    first.close()
+    second.close()
+
+
+def test_released_handle_cannot_be_used(files):
+    cache = HandleCache()
+    with cache.open(files[0]) as handle:
+        pass
+    assert handle.closed
+    with pytest.raises(ValueError):
+        handle.read()
+
+
+def test_close_is_not_cached(files):
+    cache = HandleCache()
+    handle = cache.open(files[0])
+    buffer = handle.buffer
+    handle.close()
+    assert buffer.closed
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used(files):
+    cache = HandleCache(maxsize=2)
+    buffers = []
+    for path in files:
+        handle = cache.open(path)
+        buffers.append(handle.buffer)
+        handle.release()
+    assert len(cache) == 2
+    assert [buffer.closed for buffer in buffers] == [True, False, False]
+
+
+def test_expired_handles_are_closed(files):
+    cache = HandleCache(timeout=0.0)
+    handle = cache.open(files[0])
+    buffer = handle.buffer
+    handle.release()
+    cache.open(files[1]).release()
+    assert buffer.closed
+    assert len(cache) == 1
+
+
+def test_clear(files):
+    cache = HandleCache()
+    handle = cache.open(files[0])
+    buffer = handle.buffer
+    handle.release()
+    cache.clear()
+    assert buffer.closed
+    assert len(cache) == 0
+
+
+def test_write_modes_are_not_cached(files):
+    with pytest.raises(ValueError):
+        HandleCache().open(files[0], "w")
+
+
+def test_close_releases_slot(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    cache.open(files[0], pool=pool).close()
+    assert pool.acquire(blocking=False)
+
+
+def test_idle_handle_keeps_slot_until_evicted(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    cache.open(files[0], pool=pool).release()
+    assert not pool.acquire(blocking=False)
+    cache.clear()
+    assert pool.acquire(blocking=False)
+
+
+def test_eviction_releases_slot(files):
+    cache = HandleCache(maxsize=2)
+    pool = FileHandlePool(3)
+    for path in files:
+        cache.open(path, pool=pool).release()
+    assert pool.acquire(blocking=False)
+    assert not pool.acquire(blocking=False)
+
+
+def test_exhausted_pool_reclaims_idle_handles(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    pool.add_reclaimer(cache.clear)
+    cache.open(files[0], pool=pool).release()
+
+    handle = cache.open(files[1], pool=pool)
+    assert handle.read() == "contents of b"
+    assert len(cache) == 0
+    handle.close()
+
+
+def test_sweep_below_watermark_keeps_handles(files):
+    cache = HandleCache(watermark=1.0)
+    cache.open(files[0]).release()
+    assert cache.sweep() == 0
+    assert len(cache) == 1
+
+
+def test_sweep_above_watermark_closes_idle_handles(files):
+    cache = HandleCache(watermark=0.0)
+    pool = FileHandlePool(2)
+    cache.open(files[0], pool=pool).release()
+    in_use = cache.open(files[1], pool=pool)
+    assert cache.sweep() == 1
+    assert len(cache) == 0
+    assert pool.acquire(blocking=False)
+    assert in_use.read() == "contents of b"
+    in_use.close()
+
+
+def test_open_sweeps_on_miss(files):
+    cache = HandleCache(watermark=0.0, sweep_interval=0.0)
+    handle = cache.open(files[0])
+    buffer = handle.buffer
+    handle.release()
+    cache.open(files[1]).release()
+    assert buffer.closed
+    assert len(cache) == 1
+
+
+class _Cycle:
+    def __init__(self, handle):
+        self.handle = handle
+        self.this = self
+
+
+def test_collected_handle_is_reused(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    handle = cache.open(files[0], pool=pool)
+    fd = handle.fileno()
+    _Cycle(handle)
+    del handle
+    gc.collect()
+
+    handle = cache.open(files[0], pool=pool)
+    assert handle.fileno() == fd
+    handle.close()
+    assert pool.acquire(blocking=False)
+
+
+def test_collected_handle_releases_slot(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    handle = cache.open(files[0], pool=pool)
+    # The collector may finalize the file before the handle wrapping it.
+    handle.buffer.raw.close()
+    _Cycle(handle)
+    del handle
+    gc.collect()
+
+    cache.clear()
+    assert pool.acquire(blocking=False)
+
+
+def test_collected_handle_is_reclaimed_by_pool(files):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    pool.add_reclaimer(cache.clear)
+    _Cycle(cache.open(files[0], pool=pool))
+    gc.collect()
+    assert pool.acquire(timeout=1.0)
+
+
+def test_finalizer_does_not_take_the_lock(files):
+    cache = HandleCache()
+    handle = cache.open(files[0])
+    with cache._lock:
+        handle.__del__()
+    assert len(cache) == 0
+    cache.open(files[1]).release()
+    assert len(cache) == 2
+
+
+def test_replaced_file_is_reopened(files, tmp_path):
+    cache = HandleCache()
+    pool = FileHandlePool(1)
+    cache.open(files[0], pool=pool).release()
+
+    replacement = tmp_path / "replacement.txt"
+    replacement.write_text("replaced")
+    os.replace(replacement, files[0])
+
+    handle = cache.open(files[0], pool=pool)
+    assert handle.read() == "replaced"
+    handle.close()
+    assert pool.acquire(blocking=False)
+
+
+def test_modified_file_is_reopened(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"AAAABBBB")
+    cache = HandleCache()
+    handle = cache.open(path, "rb")
+    assert handle.read(2) == b"AA"
+    handle.release()
+
+    # Rewritten in place, so the inode and size stay the same.
+    with open(path, "r+b") as f:
+        f.write(b"CCCCDDDD")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    with cache.open(path, "rb") as handle:
+        assert handle.read() == b"CCCCDDDD"
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from filefactory import FileOpener
+from filefactory._context import FactoryContext
+
+
+def test_one_context_per_source(package, root):
+    ctx = FactoryContext.get(package)
+    assert FactoryContext.get(package) is ctx
+    assert ctx.root == root
+    assert ctx.root_str == os.fspath(root)
+
+
+def test_dir_fd_is_cached(package, root):
+    (root / "sub").mkdir()
+    ctx = FactoryContext.get(package)
+    fd = ctx.dir_fd(str(root / "sub"))
+    assert ctx.dir_fd(str(root / "sub")) == fd
+    assert os.path.samestat(os.fstat(fd), os.stat(root / "sub"))
+
+
+def test_factories_share_dir_fds(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("text")
+    ctx = FactoryContext.get(package)
+    with FileOpener(package, "txt")("file", ("sub",), mode="a"):
+        pass
+    fd = ctx.dir_fd(str(root / "sub"))
+    with FileOpener(package, "txt", mode="rb")("file", ("sub",)) as f:
+        assert f.read() == b"text"
+    assert ctx.dir_fd(str(root / "sub")) == fd
+
+
+def test_close_reopens_on_demand(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("text")
+    ctx = FactoryContext.get(package)
+    ctx.dir_fd(str(root / "sub"))
+    ctx.close()
+    assert ctx.dfd_cache == {}
+    with FileOpener(package, "txt", mode="rb")("file", ("sub",)) as f:
+        assert f.read() == b"text"
+
+
+def test_refresh_keeps_current_fd(package, root):
+    (root / "sub").mkdir()
+    ctx = FactoryContext.get(package)
+    fd = ctx.dir_fd(str(root / "sub"))
+    assert ctx.refresh(str(root / "sub"), fd) is None
+    assert ctx.dir_fd(str(root / "sub")) == fd
+
+
+def test_refresh_swaps_replaced_directory(package, root):
+    (root / "sub").mkdir()
+    ctx = FactoryContext.get(package)
+    fd = ctx.dir_fd(str(root / "sub"))
+    os.rmdir(root / "sub")
+    (root / "sub").mkdir()
+    fresh = ctx.refresh(str(root / "sub"), fd)
+    assert fresh is not None and fresh != fd
+    assert ctx.dir_fd(str(root / "sub")) == fresh
+    assert os.path.samestat(os.fstat(fresh), os.stat(root / "sub"))
+    # Other threads may still hold the old descriptor, so it stays open until close.
+    os.fstat(fd)
+    assert ctx.refresh(str(root / "sub"), fd) == fresh
+    ctx.close()
+    with pytest.raises(OSError):
+        os.fstat(fd)
@@ -0,0 +1,438 @@
+from pathlib import Path
+import importlib
+import io
+import os
+import shutil
+import sys
+import threading
+import zipfile
+
+import pytest
+
+from filefactory import (
+    ByteOpener,
+    Factory,
+    FileHandlePool,
+    FileOpener,
+    PathFinder,
+    StringOpener,
+)
+from filefactory._context import FactoryContext
+from filefactory.factories import FileFactoryBase, FileProcessor
+
+
+def test_file_opener_reads_and_writes(package, root):
+    (root / "sub").mkdir()
+    opener = FileOpener(package, "txt")
+    with opener("file", ("sub",), mode="w") as f:
+        f.write("written")
+    for _ in range(2):
+        with opener("file", ("sub",)) as f:
+            assert f.read() == "written"
+    assert (root / "sub" / "file.txt").read_text() == "written"
+
+
+def test_file_opener_holds_pool_slot(package, root):
+    (root / "file.txt").write_text("text")
+    pool = FileHandlePool(1)
+    opener = FileOpener(package, "txt", pool=pool)
+    with opener("file", mode="a") as f:
+        assert not pool.acquire(blocking=False)
+        f.write(" appended")
+    assert pool.acquire(blocking=False)
+    pool.release()
+    with opener("file") as f:
+        assert f.read() == "text appended"
+
+
+def test_factories_share_root(package, root):
+    assert FileOpener(package).root is FileOpener(package, "txt").root
+    assert FileOpener(package).root == root
+
+
+def test_zip_package(tmp_path, monkeypatch):
+    archive = tmp_path / "package.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("zipped_ff_package/__init__.py", "")
+        zf.writestr("zipped_ff_package/file.txt", "zipped")
+    monkeypatch.syspath_prepend(archive)
+    package = importlib.import_module("zipped_ff_package")
+    try:
+        with FileOpener(package, "txt")("file") as f:
+            assert f.read() == "zipped"
+    finally:
+        sys.modules.pop("zipped_ff_package")
+
+
+def test_file_opener_resolves_each_location(package, root):
+    (root / "one" / "two").mkdir(parents=True)
+    for directory in (root, root / "one", root / "one" / "two"):
+        (directory / "file.txt").write_text(directory.name)
+    opener = FileOpener(package, "txt")
+    for _ in range(2):
+        for sub in ((), ("one",), ("one", "two")):
+            with opener("file", sub) as f:
+                assert f.read() == (sub[-1] if sub else root.name)
+
+
+def test_byte_opener(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "data.bin").write_bytes(b"\x00\x01binary\r\n")
+    assert ByteOpener(package, "bin")("data", ("sub",)) == b"\x00\x01binary\r\n"
+
+
+@pytest.mark.parametrize("sub", [(), ("sub",), ("sub", "deeper")])
+def test_file_opener_opens_by_string_path(package, root, sub):
+    root.joinpath(*sub).mkdir(parents=True, exist_ok=True)
+    root.joinpath(*sub, "file.txt").write_text("text")
+    with FileOpener(package, "txt")("file", sub) as f:
+        assert f.name == os.path.join(root, *sub, "file.txt")
+
+
+@pytest.mark.parametrize(
+    "extension, expected", [("txt", ".txt"), (".txt", ".txt"), (None, "")]
+)
+def test_extension_is_normalised(package, extension, expected):
+    assert FileOpener(package, extension).extension == expected
+
+
+def test_file_opener_returns_handle_on_exit(package, root):
+    (root / "file.txt").write_text("text")
+    with FileOpener(package, "txt")("file") as f:
+        assert f.read() == "text"
+    assert f.closed
+
+
+def test_file_opener_waits_for_a_slot(package, root):
+    (root / "first.txt").write_text("first")
+    (root / "second.txt").write_text("second")
+    opener = FileOpener(package, "txt", pool=FileHandlePool(1))
+    read = []
+
+    def second():
+        with opener("second") as f:
+            read.append(f.read())
+
+    with opener("first", mode="a"):
+        thread = threading.Thread(target=second)
+        thread.start()
+        thread.join(0.2)
+        assert read == []
+    thread.join(5.0)
+    assert read == ["second"]
+
+
+def test_open_raw(package, root):
+    (root / "file.txt").write_text("text")
+    f = FileOpener(package, "txt").open_raw("file", mode="rb")
+    try:
+        assert f.read() == b"text"
+    finally:
+        f.close()
+
+
+@pytest.fixture
+def source(root):
+    data = bytes(range(256)) * 1024
+    (root / "data.bin").write_bytes(data)
+    return data
+
+
+def test_copy_to_file(package, source, tmp_path):
+    target = tmp_path / "copy.bin"
+    with open(target, "wb") as dst:
+        dst.write(b"header")
+        assert ByteOpener(package, "bin").copy_to("data", dst=dst) == len(source)
+        dst.write(b"footer")
+    assert target.read_bytes() == b"header" + source + b"footer"
+
+
+def test_copy_to_fd(package, source, tmp_path):
+    target = tmp_path / "copy.bin"
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT)
+    try:
+        os.write(fd, b"header")
+        assert ByteOpener(package, "bin").copy_to("data", dst=fd) == len(source)
+    finally:
+        os.close(fd)
+    assert target.read_bytes() == b"header" + source
+
+
+def test_copy_to_bytesio(package, source):
+    dst = io.BytesIO()
+    dst.write(b"header")
+    assert ByteOpener(package, "bin").copy_to("data", dst=dst) == len(source)
+    assert dst.getvalue() == b"header" + source
+
+
+def test_path_finder(package, root):
+    assert PathFinder(package, "txt")("file", ("sub",)) == root / "sub" / "file.txt"
+
+
+def test_file_processor_passes_path(package, root):
+    assert FileProcessor(package, "txt")("file") == root / "file.txt"
+
+
+def test_file_processor_merges_keywords(package, root):
+    def process(path, *args, **kwds):
+        return path, args, kwds
+
+    processor = FileProcessor(package, "txt", process, None, flag=1, other=2)
+    assert processor("file") == (root / "file.txt", (), {"flag": 1, "other": 2})
+    assert processor("file", (), "arg", flag=3) == (
+        root / "file.txt",
+        ("arg",),
+        {"flag": 3, "other": 2},
+    )
+    # Keywords given to one call don't leak into the next.
+    assert processor("file")[2] == {"flag": 1, "other": 2}
+
+
+def test_file_processor_passes_init_args(package, root):
+    def process(*args, **kwds):
+        return args, kwds
+
+    processor = FileProcessor(package, "txt", process, None, "first", flag=1)
+    assert processor("file", (), "second") == (
+        (root / "file.txt", "first", "second"),
+        {"flag": 1},
+    )
+    processor = FileProcessor(package, "txt", process, "source", "first")
+    assert processor("file", (), "second") == (
+        ("first", "second"),
+        {"source": root / "file.txt"},
+    )
+
+
+def test_file_processor_keywords_can_change(package, root):
+    def process(path, **kwds):
+        return kwds
+
+    processor = FileProcessor(package, "txt", process, None, flag=1)
+    processor.kwds["flag"] = 2
+    assert processor("file") == {"flag": 2}
+
+
+def test_file_processor_input_keyword(package, root):
+    def process(*args, **kwds):
+        return args, kwds
+
+    processor = FileProcessor(package, "txt", process, "source", flag=1)
+    assert processor("file", ("sub",), "arg") == (
+        ("arg",),
+        {"flag": 1, "source": root / "sub" / "file.txt"},
+    )
+
+
+def test_string_opener(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "text.txt").write_bytes("line\r\nlatin é\r".encode("latin-1"))
+    read = StringOpener(package, "txt", encoding="latin-1")
+    assert read("text", ("sub",)) == "line\nlatin é\n"
+    assert read("text", ("sub",), encoding="utf-8", errors="replace") == (
+        "line\nlatin �\n"
+    )
+
+
+def test_string_opener_sees_changes(package, root):
+    path = root / "text.txt"
+    path.write_text("before")
+    read = StringOpener(package, "txt")
+    assert read("text") == "before"
+    path.write_text("after!")
+    assert read("text") == "after!"
+
+
+def test_string_opener_invalidate(package, root):
+    path = root / "text.txt"
+    path.write_text("before")
+    stat = path.stat()
+    read = StringOpener(package, "txt")
+    assert read("text") == "before"
+
+    # Same size and modification time, so only `invalidate` notices the change.
+    path.write_text("after!")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert read("text") == "before"
+    read.invalidate()
+    assert read("text") == "after!"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_byte_opener_read_many(package, root, workers):
+    names = [f"file{i}" for i in range(10)]
+    for name in names:
+        (root / f"{name}.bin").write_bytes(name.encode())
+    read = ByteOpener(package, "bin")
+    assert read.read_many(names, workers=workers) == [name.encode() for name in names]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_string_opener_read_many(package, root, workers):
+    (root / "sub").mkdir()
+    names = [f"file{i}" for i in range(10)]
+    for name in names:
+        (root / "sub" / f"{name}.txt").write_bytes(f"{name}\r\n".encode())
+    read = StringOpener(package, "txt")
+    assert read.read_many(names, ("sub",), workers=workers) == [
+        f"{name}\n" for name in names
+    ]
+    assert read.read_many([]) == []
+
+
+@pytest.mark.parametrize(
+    "factory", [FileOpener, PathFinder, FileProcessor, StringOpener, ByteOpener]
+)
+def test_factories_have_no_instance_dict(package, factory):
+    instance = factory(package, "txt")
+    assert not hasattr(instance, "__dict__")
+    with pytest.raises(AttributeError):
+        instance.unexpected = None
+
+
+def test_file_opener_creates_files_in_sub_directories(package, root):
+    (root / "one" / "two").mkdir(parents=True)
+    opener = FileOpener(package, "txt")
+    for sub in ((), ("one",), ("one", "two")):
+        with opener("new", sub, mode="x") as f:
+            f.write("/".join(sub))
+    assert (root / "one" / "two" / "new.txt").read_text() == "one/two"
+    assert (root / "new.txt").read_text() == ""
+
+
+def test_file_opener_missing_file(package, root):
+    (root / "sub").mkdir()
+    opener = FileOpener(package, "txt")
+    for sub in (("sub",), ("missing",)):
+        with pytest.raises(FileNotFoundError) as error:
+            with opener("missing", sub):
+                pass
+        assert error.value.filename == os.path.join(root, *sub, "missing.txt")
+
+
+def test_file_opener_missing_file_keeps_dir_fd(package, root):
+    (root / "sub").mkdir()
+    ctx = FactoryContext.get(package)
+    fd = ctx.dir_fd(str(root / "sub"))
+    with pytest.raises(FileNotFoundError):
+        with FileOpener(package, "txt")("missing", ("sub",)):
+            pass
+    assert ctx.dir_fd(str(root / "sub")) == fd
+
+
+@pytest.mark.parametrize(
+    "error, mode, name",
+    [(FileExistsError, "x", "file"), (IsADirectoryError, "w", "dir")],
+)
+def test_file_opener_errors_report_full_path(package, root, error, mode, name):
+    (root / "sub" / "dir.txt").mkdir(parents=True)
+    (root / "sub" / "file.txt").write_text("text")
+    with pytest.raises(error) as raised:
+        with FileOpener(package, "txt")(name, ("sub",), mode=mode):
+            pass
+    assert raised.value.filename == os.path.join(root, "sub", f"{name}.txt")
+
+
+def test_file_opener_cache_hit_stats_through_dir_fd(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("text")
+    opener = FileOpener(package, "txt")
+    with opener("file", ("sub",)) as f:
+        fd = f.fileno()
+    stats = []
+    stat = opener._stat
+    opener._stat = lambda path: stats.append(path) or stat(path)
+    with opener("file", ("sub",)) as f:
+        assert f.fileno() == fd
+        assert f.read() == "text"
+    assert stats == [os.path.join(root, "sub", "file.txt")]
+
+
+def test_file_opener_sees_replaced_directory(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("old")
+    opener = FileOpener(package, "txt")
+    with opener("file", ("sub",)) as f:
+        assert f.read() == "old"
+
+    shutil.rmtree(root / "sub")
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("new")
+    with opener("file", ("sub",)) as f:
+        assert f.read() == "new"
+    with opener("file", ("sub",), mode="a") as f:
+        f.write(" and more")
+    assert (root / "sub" / "file.txt").read_text() == "new and more"
+
+
+def test_prefetch(package, root):
+    (root / "sub").mkdir()
+    for name in ("one", "two"):
+        (root / "sub" / f"{name}.bin").write_bytes(name.encode())
+    read = ByteOpener(package, "bin")
+    read.prefetch((name for name in ("one", "two")), ("sub",))
+    assert read.read_many(["one", "two"], ("sub",)) == [b"one", b"two"]
+    with pytest.raises(FileNotFoundError):
+        read.prefetch(["missing"], ("sub",))
+
+
+@pytest.mark.parametrize("mode", ["r", "rb", "a", "r+"])
+def test_file_opener_descriptors_are_not_inherited(package, root, mode):
+    (root / "file.txt").write_text("text")
+    with FileOpener(package, "txt", mode=mode)("file") as f:
+        assert not os.get_inheritable(f.fileno())
+
+
+def test_file_opener_update_mode(package, root):
+    (root / "file.txt").write_text("text")
+    with FileOpener(package, "txt")("file", mode="r+") as f:
+        assert f.read() == "text"
+        f.write(" and more")
+    assert (root / "file.txt").read_text() == "text and more"
+
+
+def _load[T](factory: Factory[T], name: str) -> T:
+    return factory(name, ("sub",))
+
+
+def test_factory_protocol(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("text")
+    assert _load(ByteOpener(package, "txt"), "file") == b"text"
+    assert _load(StringOpener(package, "txt"), "file") == "text"
+    assert _load(PathFinder(package, "txt"), "file") == root / "sub" / "file.txt"
+    assert _load(FileProcessor(package, "txt", Path.stat), "file").st_size == 4
+    assert not callable(FileFactoryBase(package, "txt"))
+
+
+def test_file_opener_sees_replaced_file(package, root):
+    (root / "file.txt").write_text("old")
+    opener = FileOpener(package, "txt")
+    with opener("file") as f:
+        assert f.read() == "old"
+    (root / "new.txt").write_text("new")
+    os.replace(root / "new.txt", root / "file.txt")
+    with opener("file") as f:
+        assert f.read() == "new"
+
+
+@pytest.mark.parametrize("sub", [(), ("sub",)])
+def test_absolute_names(package, root, tmp_path, sub):
+    (root / "sub").mkdir()
+    path = tmp_path / "outside.txt"
+    path.write_text("outside")
+    assert ByteOpener(package, None)(str(path), sub) == b"outside"
+    with FileOpener(package, None)(str(path), sub) as f:
+        assert f.name == str(path)
+        assert f.read() == "outside"
+
+
+def test_sub_directories_as_list(package, root):
+    (root / "sub").mkdir()
+    (root / "sub" / "file.txt").write_text("text")
+    assert PathFinder(package, "txt")("file", ["sub"]) == root / "sub" / "file.txt"
+    assert FileProcessor(package, "txt")("file", ["sub"]) == root / "sub" / "file.txt"
+    assert ByteOpener(package, "txt")("file", ["sub"]) == b"text"
+    assert StringOpener(package, "txt")("file", ["sub"]) == "text"
+    with FileOpener(package, "txt")("file", ["sub"]) as f:
+        assert f.read() == "text"
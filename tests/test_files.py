@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+from filefactory import _files
+
+# Sizes either side of each read tier: a single read, a buffered read and a memory map.
+SIZES = [
+    0,
+    10,
+    _files.DIRECT_READ_LIMIT,
+    _files.DIRECT_READ_LIMIT + 1,
+    _files.MMAP_LIMIT,
+    _files.MMAP_LIMIT + 1,
+]
+
+
+def _data(size):
+    return bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_read_bytes(tmp_path, size):
+    path = tmp_path / "data.bin"
+    path.write_bytes(_data(size))
+    assert _files.read_bytes(path) == _data(size)
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_read_text_newlines(tmp_path, size, newline):
+    path = tmp_path / "text.txt"
+    line = ("a line of text ✓" + newline).encode("utf-8")
+    path.write_bytes(line * (size // len(line) + 1))
+    text = _files.read_text(path, "utf-8", None)
+    assert text == path.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin-1", "utf-16"])
+def test_read_text_encoding(tmp_path, encoding):
+    path = tmp_path / "text.txt"
+    path.write_bytes("plain\r\nlatin é\rend".encode(encoding))
+    text = _files.read_text(path, encoding, None)
+    assert text == path.read_text(encoding=encoding)
+
+
+def test_read_text_default_encoding(tmp_path):
+    path = tmp_path / "text.txt"
+    path.write_bytes(b"plain\r\nascii\rend")
+    assert _files.read_text(path, None, None) == path.read_text()
+    assert _files.read_text(path, "locale", None) == path.read_text()
+
+
+def test_read_text_errors(tmp_path):
+    path = tmp_path / "text.txt"
+    path.write_bytes(b"bad \xff byte")
+    with pytest.raises(UnicodeDecodeError):
+        _files.read_text(path, "utf-8", None)
+    assert _files.read_text(path, "utf-8", "replace") == "bad � byte"
+
+
+def test_read_small_file_that_grew(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(_data(10))
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with open(path, "ab") as f:
+            f.write(_data(10))
+        assert _files._read_small(fd, 10) == _data(10) * 2
+    finally:
+        os.close(fd)
+
+
+def test_read_small_short_reads(tmp_path, monkeypatch):
+    path = tmp_path / "data.bin"
+    path.write_bytes(_data(10))
+    read = os.read
+    monkeypatch.setattr(os, "read", lambda fd, n: read(fd, min(n, 3)))
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        assert _files._read_small(fd, 10) == _data(10)
+    finally:
+        os.close(fd)
+
+
+def test_prefetch(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(_data(1000))
+    _files.prefetch(path)
+    with pytest.raises(FileNotFoundError):
+        _files.prefetch(tmp_path / "missing.bin")
+
+
+def test_prefetch_without_fadvise(tmp_path, monkeypatch):
+    path = tmp_path / "data.bin"
+    path.write_bytes(_data(1000))
+    monkeypatch.delattr(_files.os, "posix_fadvise", raising=False)
+    reads = []
+    read = _files.os.read
+
+    def counting_read(fd, n):
+        data = read(fd, n)
+        reads.append(len(data))
+        return data
+
+    monkeypatch.setattr(_files.os, "read", counting_read)
+    _files.prefetch(path)
+    assert sum(reads) == 1000
+
+
+@pytest.mark.parametrize(
+    "mode, flags",
+    [
+        ("r", os.O_RDONLY),
+        ("rb", os.O_RDONLY),
+        ("rt", os.O_RDONLY),
+        ("w", os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+        ("ab", os.O_WRONLY | os.O_CREAT | os.O_APPEND),
+        ("x", os.O_WRONLY | os.O_CREAT | os.O_EXCL),
+        ("r+b", os.O_RDWR),
+        ("w+", os.O_RDWR | os.O_CREAT | os.O_TRUNC),
+    ],
+)
+def test_mode_flags(mode, flags):
+    always = _files.O_BINARY | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_NOCTTY", 0)
+    assert _files.mode_flags(mode) == flags | always
@@ -0,0 +1,51 @@
+import pytest
+
+from filefactory import FileHandlePool
+
+
+def test_acquire_until_exhausted():
+    pool = FileHandlePool(2)
+    assert pool.acquire(blocking=False)
+    assert pool.acquire(blocking=False)
+    assert not pool.acquire(blocking=False)
+    pool.release()
+    assert pool.acquire(blocking=False)
+
+
+def test_blocked_acquire_times_out():
+    pool = FileHandlePool(1)
+    pool.acquire()
+    assert not pool.acquire(timeout=0.1)
+
+
+def test_blocked_acquire_calls_reclaimers():
+    pool = FileHandlePool(1)
+    pool.acquire()
+    calls = []
+
+    def reclaim():
+        calls.append(None)
+        pool.release()
+
+    pool.add_reclaimer(reclaim)
+    pool.add_reclaimer(reclaim)
+    assert pool.acquire(timeout=1.0)
+    assert len(calls) == 1
+
+
+def test_open_gives_slot_back(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("text")
+    pool = FileHandlePool(1)
+    with pool.open(path) as f:
+        assert f.read() == "text"
+        assert not pool.acquire(blocking=False)
+    assert pool.acquire(blocking=False)
+
+
+def test_failed_open_gives_slot_back(tmp_path):
+    pool = FileHandlePool(1)
+    with pytest.raises(FileNotFoundError):
+        with pool.open(tmp_path / "missing.txt"):
+            pass
+    assert pool.acquire(blocking=False)